@@ -0,0 +1,56 @@
+"""Compare per-document and micro-batched classification against Bedrock.
+
+Calls the deployed model, so it needs AWS credentials with bedrock:InvokeModel.
+Run from cdk-app: python benchmarks/bench_batch_classification.py [documents]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda-functions'))
+
+import processing
+
+SAMPLES = [
+    ('Dietary Supplement', 'value pack amazon basics vitamin C 250 mg per serving 300 tablets dietary supplement'),
+    ('Stationery', 'spiral notebook college ruled 70 sheets 8 x 10.5 in assorted colors'),
+    ('Kitchen Supplies', 'nonstick frying pan 10 inch aluminum dishwasher safe cookware'),
+    ('Medicine', 'ibuprofen tablets 200 mg pain reliever fever reducer NSAID drug facts'),
+    ('Invoice', 'INVOICE #1042 bill to Acme Corp subtotal 350.00 tax 28.00 amount due 378.00'),
+    ('W2', 'Form W-2 wage and tax statement employer identification number wages tips 52000'),
+    ('Driver License', 'DRIVER LICENSE DL 123456789 DOB 01/02/1990 class C expires 01/02/2030'),
+    ('Other', 'concert ticket row 12 seat 4 general admission doors open 7pm'),
+]
+
+def run(documents, batch_size):
+    processing.CLASSIFICATION_BATCH_SIZE = batch_size
+    fallbacks = []
+    processing.emit_metrics = lambda metrics, *args, **kwargs: fallbacks.append(metrics.get('BatchClassificationFallback', 0))
+    
+    start = time.perf_counter()
+    if batch_size == 1:
+        results = {document_id: processing.classify_document(text) for document_id, text in documents.items()}
+    else:
+        results = processing.classify_documents_batch(documents)
+    elapsed = time.perf_counter() - start
+    return results, elapsed, sum(fallbacks)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    documents = {f'doc-{i}': SAMPLES[i % len(SAMPLES)][1] for i in range(count)}
+    expected = {f'doc-{i}': SAMPLES[i % len(SAMPLES)][0] for i in range(count)}
+    
+    print('%-6s %9s %10s %14s %10s %9s %9s' % ('batch', 'requests', 'total s', 'batch lat. s', 'docs/s', 'fallback', 'correct'))
+    for batch_size in (1, 2, 5, 10):
+        results, elapsed, fallback = run(documents, batch_size)
+        correct = sum(results[d].get('category') == expected[d] for d in documents)
+        batches = (count + batch_size - 1) // batch_size
+        # One request per chunk (a single-document chunk is an individual request,
+        # not a fallback) plus one per fallback document from a multi-document chunk
+        requests = batches + fallback if batch_size > 1 else count
+        print('%-6d %9d %10.2f %14.2f %10.2f %9d %9d' % (
+            batch_size, requests, elapsed, elapsed / batches, count / elapsed, fallback, correct
+        ))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compare regex JSON extraction with json_locator on adversarial OCR text.
+
+Each cell shows the time and what the method extracted: "ok" for the
+expected value, "none" when nothing was found, "wrong" otherwise. The run
+fails if json_locator does not extract the expected value.
+
+Run from cdk-app: python benchmarks/bench_json_locator.py
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda-functions'))
+
+from json_locator import find_fenced_json, find_json_object
+
+FENCED_PATTERN = r'```(?:json)?\s*(\{.*?\})\s*```'
+GREEDY_PATTERN = r'\{.*\}'
+
+# Regex timings grow quadratically, so they are only run up to this size
+REGEX_MAX_CHARS = 256 * 1024
+
+TRAILING_OBJECT = {'category': 'Medicine', 'n': {'x': 1}}
+
+def make_inputs(size):
+    """Return {label: (text, expected fenced objects, expected first object)}."""
+    return {
+        'unclosed braces': ('{"a": ' * (size // 6), [], None),
+        'open fences': (('```json {"k": "v"' + ' ' * 32) * (size // 50), [], None),
+        'ocr + trailing json': (
+            ('vitamin C 250 mg per serving {' + '\n') * (size // 32) + json.dumps(TRAILING_OBJECT),
+            [],
+            TRAILING_OBJECT
+        ),
+        'stray braces + json': ('{' * (size // 2) + json.dumps(TRAILING_OBJECT), [], TRAILING_OBJECT)
+    }
+
+def regex_fenced(text):
+    objects = []
+    for match in re.findall(FENCED_PATTERN, text, re.DOTALL | re.IGNORECASE):
+        try:
+            objects.append(json.loads(match))
+        except ValueError:
+            pass
+    return objects
+
+def regex_greedy(text):
+    match = re.search(GREEDY_PATTERN, text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except ValueError:
+        return None
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+def outcome(result, expected):
+    if result == expected:
+        return 'ok'
+    return 'none' if not result else 'wrong'
+
+def cell(result, ms, expected):
+    return '%.1f %s' % (ms, outcome(result, expected))
+
+def main():
+    failures = []
+    print('%-22s %10s %16s %16s %16s %16s' % ('input', 'chars', 'regex fence', 'locator fence', 'regex greedy', 'locator first'))
+    for size in (64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024):
+        for label, (text, fenced, first) in make_inputs(size).items():
+            fence_result, fence_ms = timed(lambda: find_fenced_json(text))
+            first_result, first_ms = timed(lambda: find_json_object(text))
+            if len(text) <= REGEX_MAX_CHARS:
+                regex_fence = cell(*timed(lambda: regex_fenced(text)), fenced)
+                regex_first = cell(*timed(lambda: regex_greedy(text)), first)
+            else:
+                regex_fence = regex_first = 'skipped'
+            print('%-22s %10d %16s %16s %16s %16s' % (
+                label, len(text), regex_fence, cell(fence_result, fence_ms, fenced),
+                regex_first, cell(first_result, first_ms, first)
+            ))
+            if fence_result != fenced or first_result != first:
+                failures.append('%s (%d chars)' % (label, len(text)))
+    if failures:
+        raise SystemExit('json_locator extracted the wrong value for: ' + ', '.join(failures))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare payload size and encode time of results responses.
+
+Run from cdk-app: python benchmarks/bench_response_encoder.py
+"""
+import base64
+import json
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda-functions'))
+
+from response_encoder import encode_response
+
+WORDS = ['vitamin', 'serving', 'invoice', 'total', 'amount', 'tablet', 'daily', 'value',
+         'employer', 'wages', 'license', 'address', 'supplement', 'per', '250', 'mg']
+
+def make_item(lines):
+    rng = random.Random(lines)
+    raw_text = '\n'.join(' '.join(rng.choice(WORDS) for _ in range(8)) for _ in range(lines))
+    return {
+        'documentId': 'bench-%d' % lines,
+        'fileName': 'scan.pdf',
+        'uploadTime': '2026-10-19T00:00:00',
+        'status': 'complete',
+        'category': 'Invoice',
+        'ocrResults': {
+            'rawText': raw_text,
+            'keyValuePairs': {},
+            'extractedAt': 'lambda',
+            'textractApi': 'AnalyzeDocument',
+            'featureTypes': ['FORMS', 'TABLES']
+        },
+        'classification': {'category': 'Invoice', 'confidence': Decimal('0.95'), 'reason': 'Line items and totals'},
+        'summary': {
+            'text': raw_text[:500],
+            'keyPoints': [raw_text[i:i + 80] for i in range(0, 800, 80)],
+            'category': 'Invoice',
+            'scores': [Decimal(str(rng.random())) for _ in range(50)]
+        }
+    }
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    print('%-8s %-10s %12s %10s' % ('lines', 'encoder', 'bytes', 'ms'))
+    for lines in (100, 2000, 20000):
+        item = make_item(lines)
+        repeat = 20 if lines < 20000 else 5
+        
+        body, ms = timed(lambda: json.dumps(item, default=str), repeat)
+        print('%-8d %-10s %12d %10.2f' % (lines, 'baseline', len(body.encode()), ms))
+        
+        for label, accept in (('compact', ''), ('gzip', 'gzip')):
+            event = {'headers': {'Accept': 'application/vnd.idp+json', 'Accept-Encoding': accept}}
+            response, ms = timed(lambda: encode_response(200, item, event), repeat)
+            encoding = response['headers'].get('Content-Encoding')
+            if accept and encoding != accept:
+                continue
+            size = len(base64.b64decode(response['body'])) if encoding else len(response['body'])
+            print('%-8d %-10s %12d %10.2f' % (lines, label, size, ms))
+
+if __name__ == '__main__':
+    main()
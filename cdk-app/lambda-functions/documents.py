@@ -0,0 +1,84 @@
+import json
+import boto3
+import base64
+import os
+from boto3.dynamodb.conditions import Key, Attr
+from response_encoder import encode_response
+
+dynamodb = boto3.resource('dynamodb')
+
+STATUS_INDEX = 'StatusUploadTimeIndex'
+CATEGORY_INDEX = 'CategoryUploadTimeIndex'
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 100
+
+# Only the attributes projected into both indexes are returned
+PROJECTION = 'documentId, fileName, uploadTime, #status, category'
+
+def encode_cursor(last_evaluated_key):
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+def decode_cursor(cursor, index_key):
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    # A cursor must be a LastEvaluatedKey of the index being queried
+    expected = {'documentId', 'uploadTime', index_key}
+    if not isinstance(key, dict) or set(key) != expected or not all(isinstance(v, str) for v in key.values()):
+        raise ValueError('Invalid cursor')
+    return key
+
+def build_query(status, category, since):
+    if status:
+        index_name = STATUS_INDEX
+        key_condition = Key('status').eq(status)
+        filter_expression = Attr('category').eq(category) if category else None
+    else:
+        index_name = CATEGORY_INDEX
+        key_condition = Key('category').eq(category)
+        filter_expression = None
+    
+    if since:
+        key_condition = key_condition & Key('uploadTime').gte(since)
+    
+    query = {
+        'IndexName': index_name,
+        'KeyConditionExpression': key_condition,
+        'ProjectionExpression': PROJECTION,
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ScanIndexForward': False
+    }
+    if filter_expression is not None:
+        query['FilterExpression'] = filter_expression
+    return query
+
+def handler(event, context):
+    try:
+        table_name = os.environ['TABLE_NAME']
+        table = dynamodb.Table(table_name)
+        params = event.get('queryStringParameters') or {}
+        
+        status = params.get('status')
+        category = params.get('category')
+        since = params.get('since')
+        
+        if not status and not category:
+            return encode_response(400, {'error': 'status or category is required'}, event)
+        
+        try:
+            limit = min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+            query = build_query(status, category, since)
+            query['Limit'] = max(limit, 1)
+            if params.get('cursor'):
+                index_key = 'status' if status else 'category'
+                query['ExclusiveStartKey'] = decode_cursor(params['cursor'], index_key)
+        except ValueError:
+            return encode_response(400, {'error': 'Invalid limit or cursor'}, event)
+        
+        response = table.query(**query)
+        
+        body = {'items': response.get('Items', [])}
+        if 'LastEvaluatedKey' in response:
+            body['cursor'] = encode_cursor(response['LastEvaluatedKey'])
+        
+        return encode_response(200, body, event)
+    except Exception as e:
+        return encode_response(500, {'error': str(e)}, event)
@@ -0,0 +1,111 @@
+import json
+import re
+from collections import deque
+
+FENCE = '```'
+
+# Openers still waiting for their closer; when more are open the oldest is
+# dropped. Each character lies in at most this many candidate spans, which
+# bounds the decode work to MAX_DEPTH * len(text).
+MAX_DEPTH = 32
+
+CLOSERS = {'}': '{', ']': '['}
+
+_decoder = json.JSONDecoder()
+_structural = re.compile(r'[{\[]+|[}\]]+|"')
+# With nothing open, quotes and closers are plain text
+_openers = re.compile(r'[{\[]+')
+# A JSON string cannot contain a raw newline, so a quote without a closing
+# quote on the same line cannot be part of a valid value
+_string = re.compile(r'"(?:[^"\\\n]|\\.)*"')
+
+def balanced_spans(text):
+    """Yield (start, end) of every balanced {...} or [...] span, ordered by start.
+
+    One left-to-right pass that skips over strings inside open spans. A
+    mismatched closer or an unterminated string invalidates every span still
+    open, so stray braces in OCR text are discarded as soon as they are
+    shown not to be JSON. Spans are yielded whenever nothing is left open,
+    so a caller that stops at the first object does not scan the rest.
+    """
+    spans = []
+    stack = deque(maxlen=MAX_DEPTH)
+    match = _openers.search(text)
+    while match:
+        pos, end = match.span()
+        char = text[pos]
+        if char == '"':
+            string = _string.match(text, pos)
+            if string:
+                end = string.end()
+            else:
+                stack.clear()
+        elif char in CLOSERS:
+            for pos in range(pos, end):
+                if not stack:
+                    break
+                if text[stack[-1]] != CLOSERS[text[pos]]:
+                    stack.clear()
+                    break
+                spans.append((stack.pop(), pos + 1))
+        else:
+            stack.extend(range(max(pos, end - MAX_DEPTH), end))
+        if spans and not stack:
+            yield from sorted(spans)
+            spans = []
+        match = (_structural if stack else _openers).search(text, end)
+    yield from sorted(spans)
+
+def iter_json_objects(text, max_objects=None, opener='{', value_type=dict):
+    """Yield JSON objects embedded in text, leftmost first.
+
+    Only balanced spans starting with opener ('{', or '[' with
+    value_type=list for arrays) are decoded. After a successful decode the
+    spans nested inside it are skipped, so nested objects are returned whole.
+    """
+    found = 0
+    resume = 0
+    for start, end in balanced_spans(text):
+        if start < resume or text[start] != opener:
+            continue
+        try:
+            obj, length = _decoder.raw_decode(text[start:end])
+        except (ValueError, RecursionError):
+            continue
+        if length != end - start or not isinstance(obj, value_type):
+            continue
+        yield obj
+        found += 1
+        if max_objects is not None and found >= max_objects:
+            return
+        resume = end
+
+def find_json_object(text):
+    """Return the first JSON object in text, or None."""
+    return next(iter_json_objects(text, max_objects=1), None)
+
+def find_json_array(text):
+    """Return the first JSON array in text, or None."""
+    return next(iter_json_objects(text, max_objects=1, opener='[', value_type=list), None)
+
+def find_fenced_json(text):
+    """Return the JSON objects wrapped in ``` or ```json markdown fences."""
+    objects = []
+    start = text.find(FENCE)
+    while start != -1:
+        end = text.find(FENCE, start + len(FENCE))
+        if end == -1:
+            break
+        body = text[start + len(FENCE):end]
+        if body[:4].lower() == 'json':
+            body = body[4:]
+        body = body.strip()
+        if body.startswith('{'):
+            try:
+                obj, length = _decoder.raw_decode(body)
+                if length == len(body):
+                    objects.append(obj)
+            except (ValueError, RecursionError):
+                pass
+        start = text.find(FENCE, end + len(FENCE))
+    return objects
@@ -0,0 +1,25 @@
+import json
+import time
+
+NAMESPACE = 'IdpApp'
+
+def emit_metrics(metrics, dimensions=None, unit='Count'):
+    """Publish metrics as a CloudWatch Embedded Metric Format log line.
+
+    No PutMetricData call is made; CloudWatch extracts the metrics from the
+    function's log stream.
+    """
+    dimensions = dimensions or {}
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [list(dimensions.keys())],
+                'Metrics': [{'Name': name, 'Unit': unit} for name in metrics]
+            }]
+        }
+    }
+    record.update(dimensions)
+    record.update(metrics)
+    print(json.dumps(record))
@@ -0,0 +1,92 @@
+import re
+import hashlib
+from boto3.dynamodb.conditions import Key
+
+MAX_FINGERPRINT_CHARS = 20000
+MIN_TOKENS = 8
+# 64 MinHash values indexed as 16 bands of 4. A document whose shingle set has
+# Jaccard similarity s with an indexed document shares at least one band with
+# it with probability 1 - (1 - s**4)**16: 0.9998 at 0.8, 0.89 at 0.6, 0.64 at 0.5
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_token_pattern = re.compile(r'\w+')
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+# Fixed (a, b) for the permutations h -> (a * h + b) mod p; they must never
+# change, or indexed signatures stop matching new ones
+_PERMUTATIONS = [(_hash64(f'a{i}') % (_PRIME - 1) + 1, _hash64(f'b{i}') % _PRIME) for i in range(NUM_HASHES)]
+
+def shingles(text):
+    """Word unigrams and bigrams of the first MAX_FINGERPRINT_CHARS of text."""
+    tokens = _token_pattern.findall(text[:MAX_FINGERPRINT_CHARS].lower())
+    if len(tokens) < MIN_TOKENS:
+        return set()
+    return set(tokens) | {a + ' ' + b for a, b in zip(tokens, tokens[1:])}
+
+def minhash(text):
+    """MinHash signature (NUM_HASHES 32-bit values) of the text's shingles, or None for short text."""
+    hashes = [_hash64(shingle) for shingle in shingles(text)]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in _PERMUTATIONS]
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+def encode_signature(signature):
+    return ''.join(f'{value:08x}' for value in signature)
+
+def decode_signature(encoded):
+    return [int(encoded[i:i + 8], 16) for i in range(0, len(encoded), 8)]
+
+def band_keys(signature):
+    keys = []
+    for index in range(BANDS):
+        rows = encode_signature(signature[index * ROWS:(index + 1) * ROWS])
+        keys.append(f'{index}:{hashlib.blake2b(rows.encode(), digest_size=8).hexdigest()}')
+    return keys
+
+def find_near_duplicate(table, signature, min_similarity):
+    """Return (documentId, similarity) of the most similar indexed document, or None.
+
+    Documents sharing a band with the signature are candidates; every band
+    partition is read to the end and each candidate is kept only if its
+    estimated similarity is at least min_similarity.
+    """
+    best = None
+    seen = set()
+    for band in band_keys(signature):
+        query = {
+            'KeyConditionExpression': Key('band').eq(band),
+            'ProjectionExpression': 'documentId, signature'
+        }
+        while True:
+            response = table.query(**query)
+            for item in response.get('Items', []):
+                if item['documentId'] in seen:
+                    continue
+                seen.add(item['documentId'])
+                score = similarity(signature, decode_signature(item['signature']))
+                if score >= min_similarity and (best is None or score > best[1]):
+                    best = (item['documentId'], score)
+            if 'LastEvaluatedKey' not in response:
+                break
+            query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return best
+
+def index_fingerprint(table, document_id, signature):
+    encoded = encode_signature(signature)
+    with table.batch_writer() as batch:
+        for band in band_keys(signature):
+            batch.put_item(Item={
+                'band': band,
+                'documentId': document_id,
+                'signature': encoded
+            })
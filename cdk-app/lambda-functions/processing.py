@@ -1,121 +1,426 @@
 import json
 import boto3
-import re
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from decimal import Decimal
+from json_locator import find_fenced_json, find_json_array, find_json_object
+from metrics import emit_metrics
+from near_duplicate import minhash, find_near_duplicate, index_fingerprint
 
 textract = boto3.client('textract')
 bedrock = boto3.client('bedrock-runtime')
-dynamodb = boto3.resource('dynamodb')
+# boto3 resources are not thread-safe, so each thread gets its own (see dynamodb_table)
+_thread_local = threading.local()
 
 CATEGORIES = ["Dietary Supplement", "Stationery", "Kitchen Supplies", "Medicine", "Driver License", "Invoice", "W2", "Other"]
 
+# Bump a stage's version when its prompt, CATEGORIES or extraction logic changes;
+# scripts/backfill.py can then select documents processed by an older version
+STAGE_VERSIONS = {'ocr': '1', 'classification': '1', 'summary': '1'}
+
+# OCR_MODE: 'adaptive' runs DetectDocumentText first and escalates to FORMS/TABLES
+# only for form-like documents, 'full' always uses AnalyzeDocument, 'text' never does
+OCR_MODE = os.environ.get('OCR_MODE', 'adaptive')
+
+# Keywords in the quick text pass that mark a document as form-like
+FORM_KEYWORDS = {
+    "Invoice": ["invoice", "bill to", "amount due", "subtotal", "balance due", "remit to"],
+    "W2": ["wage and tax statement", "w-2", "employer identification number", "social security wages", "federal income tax withheld"],
+    "Driver License": ["driver license", "driver's license", "drivers license", "license number", "date of birth"]
+}
+
+# Near-duplicate cache: documents whose OCR text has at least this Jaccard similarity
+# (shared word unigrams and bigrams, estimated by MinHash) with an already classified
+# document reuse its classification (and optionally summary). A rescan that changes
+# about 5% of the words scores roughly 0.8; unrelated documents score below 0.1
+NEAR_DUPLICATE_SIMILARITY = float(os.environ.get('NEAR_DUPLICATE_SIMILARITY', '0.7'))
+NEAR_DUPLICATE_REUSE_SUMMARY = os.environ.get('NEAR_DUPLICATE_REUSE_SUMMARY', 'false') == 'true'
+# Fraction of cache hits that are still classified by Bedrock to audit false matches
+NEAR_DUPLICATE_AUDIT_RATE = float(os.environ.get('NEAR_DUPLICATE_AUDIT_RATE', '0.05'))
+
+# Cache misses in one SQS batch are classified together, up to this many per Bedrock request
+CLASSIFICATION_BATCH_SIZE = int(os.environ.get('CLASSIFICATION_BATCH_SIZE', '1'))
+# Documents in one SQS batch processed concurrently (OCR, then summaries and audits);
+# keep the lane's reserved concurrency times this within the Textract and Bedrock quotas
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '4'))
+
+# Receives before SQS moves a message to the lane's dead-letter queue (maxReceiveCount)
+MAX_RECEIVE_COUNT = int(os.environ.get('MAX_RECEIVE_COUNT', '1'))
+
+# Size-based priority lane this function serves (see the processing lanes in the stack)
+LANE = os.environ.get('LANE', 'default')
+
 def handler(event, context):
+    # Lane functions receive S3 events through SQS; direct EventBridge invocation is still supported
+    if 'Records' in event:
+        # Only failed messages are returned to the queue (ReportBatchItemFailures);
+        # after repeated failures SQS moves them to the lane's dead-letter queue
+        failures = []
+        records, events, final = [], [], []
+        for record in event['Records']:
+            try:
+                body = json.loads(record['body'])
+            except ValueError:
+                body = None
+            if not isinstance(body, dict):
+                failures.append({'itemIdentifier': record['messageId']})
+                continue
+            records.append(record)
+            events.append(body)
+            # Earlier attempts leave the document 'retrying'; only the last one records 'error'
+            receive_count = int(record.get('attributes', {}).get('ApproximateReceiveCount', MAX_RECEIVE_COUNT))
+            final.append(receive_count >= MAX_RECEIVE_COUNT)
+        if len(events) > 1 and CLASSIFICATION_BATCH_SIZE > 1:
+            results = process_batch(events, final)
+        else:
+            results = [process_event(e, last) for e, last in zip(events, final)]
+        failures += [
+            {'itemIdentifier': record['messageId']}
+            for record, result in zip(records, results)
+            if result['statusCode'] != 200
+        ]
+        return {'batchItemFailures': failures}
+    return process_event(event)
+
+def dynamodb_table(name):
+    """Return a Table from this thread's own DynamoDB resource."""
+    if not hasattr(_thread_local, 'dynamodb'):
+        _thread_local.dynamodb = boto3.session.Session().resource('dynamodb')
+    return _thread_local.dynamodb.Table(name)
+
+def process_event(event, final=True):
+    started = time.time()
+    result = process_document(event, final)
+    emit_processing_metrics(event, result, started)
+    return result
+
+def emit_processing_metrics(event, result, started):
+    metrics = {'ProcessingLatency': int((time.time() - started) * 1000)}
+    if event.get('time'):
+        uploaded = datetime.fromisoformat(event['time'].replace('Z', '+00:00')).timestamp()
+        metrics['EndToEndLatency'] = int((time.time() - uploaded) * 1000)
+    emit_metrics(metrics, {'Lane': LANE}, unit='Milliseconds')
+    emit_metrics({'ProcessingErrors': int(result['statusCode'] != 200)}, {'Lane': LANE})
+
+def process_document(event, final=True):
     try:
         # Extract document info from S3 event
         bucket_name = event['detail']['bucket']['name']
         document_id = event['detail']['object']['key']
         
         table_name = os.environ['TABLE_NAME']
-        table = dynamodb.Table(table_name)
-        
-        # Step 1: OCR Processing
-        table.update_item(
-            Key={'documentId': document_id},
-            UpdateExpression='SET #status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={':status': 'processing_ocr'}
-        )
-        
-        ocr_results = perform_ocr(bucket_name, document_id)
-        
-        table.update_item(
-            Key={'documentId': document_id},
-            UpdateExpression='SET ocrResults = :ocr, #status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':ocr': ocr_results,
-                ':status': 'processing_classification'
-            }
-        )
-        
-        # Step 2: Classification
-        classification = classify_document(ocr_results.get('rawText', ''))
-        
-        table.update_item(
-            Key={'documentId': document_id},
-            UpdateExpression='SET classification = :classification, #status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':classification': classification,
-                ':status': 'processing_summarization'
-            }
-        )
-        
-        # Step 3: Summarization
-        summary = generate_summary(ocr_results.get('rawText', ''), classification.get('category', 'Other'))
-        
-        table.update_item(
-            Key={'documentId': document_id},
-            UpdateExpression='SET summary = :summary, #status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':summary': summary,
-                ':status': 'complete'
-            }
-        )
+        table = dynamodb_table(table_name)
         
-        return {'statusCode': 200, 'message': 'Processing complete'}
+        ocr_results = run_ocr_stage(table, bucket_name, document_id)
+        return run_remaining_stages(table, document_id, ocr_results)
         
     except Exception as e:
         if 'document_id' in locals() and 'table' in locals():
-            table.update_item(
-                Key={'documentId': document_id},
-                UpdateExpression='SET #status = :status, processingError = :error',
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={
-                    ':status': 'error',
-                    ':error': str(e)
-                }
-            )
+            record_error(table, document_id, e, final)
         return {'statusCode': 500, 'error': str(e)}
 
-def perform_ocr(bucket_name, document_id):
-    try:
-        response = textract.analyze_document(
-            Document={'S3Object': {'Bucket': bucket_name, 'Name': document_id}},
-            FeatureTypes=['FORMS', 'TABLES']
-        )
+def process_batch(events, final=None):
+    """Process an SQS batch, classifying cache misses together in micro-batched Bedrock requests."""
+    final = final or [True] * len(events)
+    results = [None] * len(events)
+    started = [None] * len(events)
+    
+    # Step 1: OCR Processing and near-duplicate lookup
+    def prepare(index):
+        started[index] = time.time()
+        event = events[index]
+        table = dynamodb_table(os.environ['TABLE_NAME'])
+        document_id = None
+        try:
+            bucket_name = event['detail']['bucket']['name']
+            document_id = event['detail']['object']['key']
+            ocr_results = run_ocr_stage(table, bucket_name, document_id)
+            lookup = lookup_near_duplicate(table, ocr_results.get('rawText', ''))
+            return index, document_id, ocr_results, lookup
+        except Exception as e:
+            if document_id:
+                record_error(table, document_id, e, final[index])
+            results[index] = {'statusCode': 500, 'error': str(e)}
+            emit_processing_metrics(event, results[index], started[index])
+            return None
+    
+    # Step 3: remaining stages, so one document's summary does not wait on the others
+    def finish(index, document_id, ocr_results, lookup, classification):
+        table = dynamodb_table(os.environ['TABLE_NAME'])
+        try:
+            results[index] = run_remaining_stages(table, document_id, ocr_results, lookup, classification)
+        except Exception as e:
+            record_error(table, document_id, e, final[index])
+            results[index] = {'statusCode': 500, 'error': str(e)}
+        emit_processing_metrics(events[index], results[index], started[index])
+    
+    with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(events))) as pool:
+        pending = [prepared for prepared in pool.map(prepare, range(len(events))) if prepared]
         
-        blocks = response['Blocks']
-        all_text = []
-        key_value_pairs = {}
+        # Step 2: one classification request per CLASSIFICATION_BATCH_SIZE cache misses
+        misses = {
+            document_id: ocr_results['rawText']
+            for _, document_id, ocr_results, lookup in pending
+            if lookup[2] is None and ocr_results.get('rawText')
+        }
+        classifications = classify_documents_batch(misses)
         
-        for block in blocks:
-            if block['BlockType'] == 'LINE':
-                all_text.append(block['Text'])
+        list(pool.map(
+            lambda prepared: finish(*prepared, classifications.get(prepared[1])),
+            pending
+        ))
+    return results
+
+def run_ocr_stage(table, bucket_name, document_id):
+    # Step 1: OCR Processing
+    table.update_item(
+        Key={'documentId': document_id},
+        UpdateExpression='SET #status = :status',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':status': 'processing_ocr'}
+    )
+    
+    ocr_results = perform_ocr(bucket_name, document_id)
+    
+    table.update_item(
+        Key={'documentId': document_id},
+        UpdateExpression='SET ocrResults = :ocr, #status = :status',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':ocr': ocr_results,
+            ':status': 'processing_classification'
+        }
+    )
+    return ocr_results
+
+def run_remaining_stages(table, document_id, ocr_results, lookup=None, classification=None):
+    # Step 2: Classification (reused from a near-duplicate document when possible)
+    classification, near_duplicate, summary = classify_with_near_duplicates(
+        table, document_id, ocr_results.get('rawText', ''), lookup, classification
+    )
+    
+    update_expression = 'SET classification = :classification, category = :category, #status = :status'
+    values = {
+        ':classification': classification,
+        ':category': classification.get('category', 'Other'),
+        ':status': 'processing_summarization'
+    }
+    if near_duplicate:
+        update_expression += ', nearDuplicate = :nearDuplicate'
+        values[':nearDuplicate'] = near_duplicate
+    
+    table.update_item(
+        Key={'documentId': document_id},
+        UpdateExpression=update_expression,
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues=values
+    )
+    
+    # Step 3: Summarization
+    if summary is None:
+        summary = generate_summary(ocr_results.get('rawText', ''), classification.get('category', 'Other'))
+    
+    table.update_item(
+        Key={'documentId': document_id},
+        UpdateExpression='SET summary = :summary, stageVersions = :versions, #status = :status REMOVE processingError',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':summary': summary,
+            ':versions': STAGE_VERSIONS,
+            ':status': 'complete'
+        }
+    )
+    
+    return {'statusCode': 200, 'message': 'Processing complete'}
+
+def record_error(table, document_id, error, final=True):
+    # A document that SQS will redeliver is 'retrying', not yet 'error'
+    table.update_item(
+        Key={'documentId': document_id},
+        UpdateExpression='SET #status = :status, processingError = :error',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':status': 'error' if final else 'retrying',
+            ':error': str(error)
+        }
+    )
+
+def lookup_near_duplicate(table, text_content):
+    """Return (signature, (documentId, similarity) match, source item) from the near-duplicate cache."""
+    fingerprint = minhash(text_content) if os.environ.get('FINGERPRINT_TABLE_NAME') else None
+    if fingerprint is None:
+        return None, None, None
+    
+    # The cache is only an optimisation: a failed or throttled lookup is a miss
+    try:
+        fingerprint_table = dynamodb_table(os.environ['FINGERPRINT_TABLE_NAME'])
+        match = find_near_duplicate(fingerprint_table, fingerprint, NEAR_DUPLICATE_SIMILARITY)
+        source = None
+        if match:
+            source = table.get_item(
+                Key={'documentId': match[0]},
+                ProjectionExpression='classification, summary'
+            ).get('Item')
+    except Exception as e:
+        print(f'Near-duplicate lookup failed: {e}')
+        emit_metrics({'NearDuplicateError': 1})
+        return fingerprint, None, None
+    if source and not source.get('classification'):
+        source = None
+    return fingerprint, match, source
+
+def classify_with_near_duplicates(table, document_id, text_content, lookup=None, classification=None):
+    """Return (classification, nearDuplicate record or None, reused summary or None).
+
+    lookup and classification may be precomputed by process_batch; a
+    classification is only used when the near-duplicate cache misses.
+    """
+    fingerprint, match, source = lookup or lookup_near_duplicate(table, text_content)
+    if fingerprint is None:
+        return classification or classify_document(text_content), None, None
+    
+    if source is None:
+        emit_metrics({'NearDuplicateMiss': 1})
+        classification = classification or classify_document(text_content)
+        if not str(classification.get('reason', '')).startswith('Error'):
+            try:
+                fingerprint_table = dynamodb_table(os.environ['FINGERPRINT_TABLE_NAME'])
+                index_fingerprint(fingerprint_table, document_id, fingerprint)
+            except Exception as e:
+                print(f'Near-duplicate indexing failed: {e}')
+                emit_metrics({'NearDuplicateError': 1})
+        return classification, None, None
+    
+    classification = dict(source['classification'])
+    near_duplicate = {
+        'sourceDocumentId': match[0],
+        'similarity': Decimal(str(round(match[1], 4))),
+        'reused': ['classification']
+    }
+    summary = None
+    if NEAR_DUPLICATE_REUSE_SUMMARY and source.get('summary'):
+        summary = source['summary']
+        near_duplicate['reused'].append('summary')
+    
+    metrics = {'NearDuplicateHit': 1}
+    audit = classify_document(text_content) if random.random() < NEAR_DUPLICATE_AUDIT_RATE else None
+    # A failed or throttled audit says nothing about the match; keep the cached result
+    if audit and not str(audit.get('reason', '')).startswith('Error'):
+        near_duplicate['auditCategory'] = audit.get('category', 'Other')
+        metrics['NearDuplicateAudit'] = 1
+        metrics['NearDuplicateFalseMatch'] = int(audit.get('category') != classification.get('category'))
+        if metrics['NearDuplicateFalseMatch']:
+            # The fresh result wins; nothing from the source document is kept
+            classification, summary = audit, None
+            near_duplicate['reused'] = []
+    emit_metrics(metrics)
+    
+    return classification, near_duplicate, summary
+
+def detect_form_category(text_content):
+    lowered = text_content.lower()
+    for category, keywords in FORM_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return category
+    return None
+
+def extract_lines(blocks):
+    return '\n'.join(block['Text'] for block in blocks if block['BlockType'] == 'LINE')
+
+def related_ids(block, relationship_type):
+    return [
+        block_id
+        for relationship in block.get('Relationships', [])
+        if relationship['Type'] == relationship_type
+        for block_id in relationship['Ids']
+    ]
+
+def block_text(block, block_map):
+    words = []
+    for child_id in related_ids(block, 'CHILD'):
+        child = block_map.get(child_id, {})
+        if child.get('BlockType') == 'WORD':
+            words.append(child['Text'])
+        elif child.get('BlockType') == 'SELECTION_ELEMENT':
+            words.append(child.get('SelectionStatus', ''))
+    return ' '.join(words).strip()
+
+def extract_forms_and_tables(blocks):
+    """Return (keyValuePairs, tables) from AnalyzeDocument FORMS/TABLES blocks.
+
+    Each table is a list of rows of cell text.
+    """
+    block_map = {block['Id']: block for block in blocks}
+    key_value_pairs = {}
+    tables = []
+    for block in blocks:
+        if block['BlockType'] == 'KEY_VALUE_SET' and 'KEY' in block.get('EntityTypes', []):
+            key = block_text(block, block_map)
+            value = ' '.join(
+                block_text(block_map[value_id], block_map)
+                for value_id in related_ids(block, 'VALUE') if value_id in block_map
+            ).strip()
+            if key and value:
+                key_value_pairs[key] = value
+        elif block['BlockType'] == 'TABLE':
+            cells = [block_map[cell_id] for cell_id in related_ids(block, 'CHILD') if cell_id in block_map]
+            cells = [cell for cell in cells if cell['BlockType'] == 'CELL']
+            if not cells:
+                continue
+            rows = [[''] * max(cell['ColumnIndex'] for cell in cells) for _ in range(max(cell['RowIndex'] for cell in cells))]
+            for cell in cells:
+                rows[cell['RowIndex'] - 1][cell['ColumnIndex'] - 1] = block_text(cell, block_map)
+            tables.append(rows)
+    return key_value_pairs, tables
+
+def perform_ocr(bucket_name, document_id, before_request=None):
+    # before_request, if given, is called before each Textract request (the backfill rate limiter)
+    throttle = before_request or (lambda: None)
+    try:
+        document = {'S3Object': {'Bucket': bucket_name, 'Name': document_id}}
+        form_hint = None
         
-        raw_text = '\n'.join(all_text)
+        if OCR_MODE == 'full':
+            escalate = True
+        else:
+            throttle()
+            response = textract.detect_document_text(Document=document)
+            raw_text = extract_lines(response['Blocks'])
+            form_hint = detect_form_category(raw_text)
+            escalate = OCR_MODE == 'adaptive' and form_hint is not None
         
-        # Handle markdown JSON
-        json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
-        matches = re.findall(json_pattern, raw_text, re.DOTALL | re.IGNORECASE)
+        if escalate:
+            throttle()
+            response = textract.analyze_document(
+                Document=document,
+                FeatureTypes=['FORMS', 'TABLES']
+            )
+            raw_text = extract_lines(response['Blocks'])
+            key_value_pairs, tables = extract_forms_and_tables(response['Blocks'])
+        else:
+            key_value_pairs, tables = {}, []
         
         result = {
             'keyValuePairs': key_value_pairs,
             'rawText': raw_text,
-            'extractedAt': 'lambda'
+            'extractedAt': 'lambda',
+            'textractApi': 'AnalyzeDocument' if escalate else 'DetectDocumentText',
+            'featureTypes': ['FORMS', 'TABLES'] if escalate else []
         }
         
-        if matches:
-            parsed_json = []
-            for match in matches:
-                try:
-                    parsed_json.append(json.loads(match))
-                except:
-                    pass
-            if parsed_json:
-                result['markdownJson'] = parsed_json
+        if tables:
+            result['tables'] = tables
+        if form_hint:
+            result['formHint'] = form_hint
+        
+        # Handle markdown JSON
+        parsed_json = find_fenced_json(raw_text)
+        if parsed_json:
+            result['markdownJson'] = parsed_json
         
         return result
     except Exception as e:
@@ -132,42 +437,79 @@ Document: {text_content[:2000]}
 Respond with JSON: {{"category": "name", "confidence": 0.95, "reason": "explanation"}}"""
     
     try:
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1000,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        
-        response = bedrock.invoke_model(
-            modelId='global.anthropic.claude-sonnet-4-20250514-v1:0',
-            body=json.dumps(request_body)
-        )
+        content = invoke_model(prompt, 1000)
         
-        response_body = json.loads(response['body'].read())
-        content = response_body['content'][0]['text']
-        
-        try:
-            classification = json.loads(content)
-        except:
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                classification = json.loads(json_match.group())
-            else:
-                classification = {'category': 'Other', 'confidence': 0.5, 'reason': 'Parse error'}
+        classification = find_json_object(content)
+        if classification is None:
+            classification = {'category': 'Other', 'confidence': 0.5, 'reason': 'Parse error'}
         
-        if classification.get('category') not in CATEGORIES:
-            classification['category'] = 'Other'
-        
-        # Convert confidence to Decimal for DynamoDB
-        confidence = classification.get('confidence', 0.5)
-        if isinstance(confidence, (int, float)):
-            classification['confidence'] = Decimal(str(confidence))
-        
-        return classification
+        return normalize_classification(classification)
         
     except Exception as e:
         return {'category': 'Other', 'confidence': Decimal('0.0'), 'reason': f'Error: {str(e)}'}
 
+def normalize_classification(classification):
+    if classification.get('category') not in CATEGORIES:
+        classification['category'] = 'Other'
+    
+    # Convert confidence to Decimal for DynamoDB
+    confidence = classification.get('confidence', 0.5)
+    if isinstance(confidence, (int, float)):
+        classification['confidence'] = Decimal(str(confidence))
+    
+    return classification
+
+def classify_documents_batch(documents):
+    """Classify {documentId: text} with one request per CLASSIFICATION_BATCH_SIZE documents.
+
+    Documents missing from a batch response, or whose entry fails
+    validation, fall back to an individual classify_document call.
+    """
+    classifications = {}
+    items = list(documents.items())
+    for start in range(0, len(items), CLASSIFICATION_BATCH_SIZE):
+        chunk = dict(items[start:start + CLASSIFICATION_BATCH_SIZE])
+        # A single document is classified individually; that is not a fallback
+        if len(chunk) > 1:
+            classifications.update(classify_chunk(chunk))
+            fallback = [document_id for document_id in chunk if document_id not in classifications]
+            emit_metrics({'BatchClassified': len(chunk) - len(fallback), 'BatchClassificationFallback': len(fallback)})
+        else:
+            fallback = list(chunk)
+        for document_id in fallback:
+            classifications[document_id] = classify_document(chunk[document_id])
+    return classifications
+
+def classify_chunk(chunk):
+    documents = '\n\n'.join(
+        f'<document id="{document_id}">\n{text_content[:2000]}\n</document>'
+        for document_id, text_content in chunk.items()
+    )
+    prompt = f"""Classify each of these documents into one of these categories: {', '.join(CATEGORIES)}
+
+{documents}
+
+Respond with a JSON array containing one entry per document: [{{"documentId": "id", "category": "name", "confidence": 0.95, "reason": "explanation"}}]"""
+    
+    try:
+        entries = find_json_array(invoke_model(prompt, 200 * len(chunk) + 500))
+    except Exception:
+        return {}
+    
+    classifications = {}
+    for entry in entries or []:
+        if not isinstance(entry, dict):
+            continue
+        document_id = entry.pop('documentId', None)
+        confidence = entry.get('confidence')
+        if (not isinstance(document_id, str) or document_id not in chunk or document_id in classifications
+                or entry.get('category') not in CATEGORIES
+                or isinstance(confidence, bool) or not isinstance(confidence, (int, float))
+                or not 0 <= confidence <= 1):
+            continue
+        classifications[document_id] = normalize_classification(entry)
+    return classifications
+
 def generate_summary(text_content, document_category):
     if not text_content:
         return {'text': 'No content to summarize', 'keyPoints': [], 'category': document_category}
@@ -179,32 +521,15 @@ Document: {text_content[:3000]}
 Respond with JSON: {{"text": "brief summary", "keyPoints": ["point1", "point2"], "category": "{document_category}"}}"""
     
     try:
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1500,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        
-        response = bedrock.invoke_model(
-            modelId='global.anthropic.claude-sonnet-4-20250514-v1:0',
-            body=json.dumps(request_body)
-        )
-        
-        response_body = json.loads(response['body'].read())
-        content = response_body['content'][0]['text']
+        content = invoke_model(prompt, 1500)
         
-        try:
-            summary = json.loads(content)
-        except:
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                summary = json.loads(json_match.group())
-            else:
-                summary = {
-                    "text": content[:500] if content else "Summary unavailable",
-                    "keyPoints": [content[:200]] if content else [],
-                    "category": document_category
-                }
+        summary = find_json_object(content)
+        if summary is None:
+            summary = {
+                "text": content[:500] if content else "Summary unavailable",
+                "keyPoints": [content[:200]] if content else [],
+                "category": document_category
+            }
         
         summary['generatedAt'] = 'lambda'
         return summary
@@ -216,3 +541,18 @@ Respond with JSON: {{"text": "brief summary", "keyPoints": ["point1", "point2"],
             'category': document_category,
             'generatedAt': 'lambda'
         }
+
+def invoke_model(prompt, max_tokens):
+    request_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    
+    response = bedrock.invoke_model(
+        modelId='global.anthropic.claude-sonnet-4-20250514-v1:0',
+        body=json.dumps(request_body)
+    )
+    
+    response_body = json.loads(response['body'].read())
+    return response_body['content'][0]['text']
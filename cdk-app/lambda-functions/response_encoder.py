@@ -0,0 +1,85 @@
+import json
+import gzip
+import base64
+from decimal import Decimal
+
+# Bodies smaller than this are not worth the compression overhead
+MIN_COMPRESS_BYTES = 1024
+
+# The only binary media type configured on the REST API. API Gateway decodes a
+# base64 body only when the request's Accept header matches it, so clients opt in
+# to compressed responses with Accept: application/vnd.idp+json
+COMPRESSED_MEDIA_TYPE = 'application/vnd.idp+json'
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+}
+
+def to_json_compatible(value):
+    """Convert DynamoDB types to plain JSON types, dropping empty maps."""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            item = to_json_compatible(item)
+            if item != {}:
+                result[key] = item
+        return result
+    if isinstance(value, list):
+        return [to_json_compatible(item) for item in value]
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(to_json_compatible(item) for item in value)
+    return value
+
+def get_header(event, name):
+    headers = (event or {}).get('headers') or {}
+    return next((v for k, v in headers.items() if k.lower() == name), '') or ''
+
+def accepts_compressed(event):
+    accept = get_header(event, 'accept').split(',')[0]
+    return accept.partition(';')[0].strip().lower() == COMPRESSED_MEDIA_TYPE
+
+def accepted_encodings(event):
+    accept = get_header(event, 'accept-encoding')
+    encodings = set()
+    for token in accept.split(','):
+        name, _, params = token.strip().partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and not params[2:].strip('0.'):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+def compress_body(body, encodings):
+    data = body.encode('utf-8')
+    if len(data) < MIN_COMPRESS_BYTES:
+        return None, None
+    if 'gzip' in encodings or '*' in encodings:
+        return gzip.compress(data, compresslevel=5), 'gzip'
+    return None, None
+
+def encode_response(status_code, body, event=None):
+    """Build an API Gateway proxy response, compressing the body when the client allows it."""
+    encoded = json.dumps(to_json_compatible(body), separators=(',', ':'))
+    headers = dict(CORS_HEADERS)
+    headers['Content-Type'] = 'application/json'
+    headers['Vary'] = 'Accept, Accept-Encoding'
+    
+    compressed, encoding = None, None
+    if accepts_compressed(event):
+        compressed, encoding = compress_body(encoded, accepted_encodings(event))
+    if compressed is None:
+        return {'statusCode': status_code, 'headers': headers, 'body': encoded}
+    
+    headers['Content-Type'] = COMPRESSED_MEDIA_TYPE
+    headers['Content-Encoding'] = encoding
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
+    }
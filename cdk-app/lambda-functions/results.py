@@ -1,6 +1,6 @@
-import json
 import boto3
 import os
+from response_encoder import encode_response
 
 dynamodb = boto3.resource('dynamodb')
 
@@ -13,32 +13,8 @@ def handler(event, context):
         response = table.get_item(Key={'documentId': document_id})
         
         if 'Item' not in response:
-            return {
-                'statusCode': 404,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type',
-                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-                },
-                'body': json.dumps({'error': 'Document not found'})
-            }
+            return encode_response(404, {'error': 'Document not found'}, event)
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-            },
-            'body': json.dumps(response['Item'], default=str)
-        }
+        return encode_response(200, response['Item'], event)
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+        return encode_response(500, {'error': str(e)}, event)
@@ -28,10 +28,12 @@ const cdk = __importStar(require("aws-cdk-lib"));
 const s3 = __importStar(require("aws-cdk-lib/aws-s3"));
 const dynamodb = __importStar(require("aws-cdk-lib/aws-dynamodb"));
 const lambda = __importStar(require("aws-cdk-lib/aws-lambda"));
+const lambdaEventSources = __importStar(require("aws-cdk-lib/aws-lambda-event-sources"));
 const apigateway = __importStar(require("aws-cdk-lib/aws-apigateway"));
 const events = __importStar(require("aws-cdk-lib/aws-events"));
 const targets = __importStar(require("aws-cdk-lib/aws-events-targets"));
 const iam = __importStar(require("aws-cdk-lib/aws-iam"));
+const sqs = __importStar(require("aws-cdk-lib/aws-sqs"));
 const path = __importStar(require("path"));
 class IdpApp100420251116Stack extends cdk.Stack {
     constructor(scope, id, props) {
@@ -58,6 +60,39 @@ class IdpApp100420251116Stack extends cdk.Stack {
             writeCapacity: 5,
             removalPolicy: cdk.RemovalPolicy.DESTROY,
         });
+        // Secondary indexes for listing documents by status or category
+        resultsTable.addGlobalSecondaryIndex({
+            indexName: 'StatusUploadTimeIndex',
+            partitionKey: { name: 'status', type: dynamodb.AttributeType.STRING },
+            sortKey: { name: 'uploadTime', type: dynamodb.AttributeType.STRING },
+            projectionType: dynamodb.ProjectionType.INCLUDE,
+            nonKeyAttributes: ['fileName', 'category'],
+            readCapacity: 5,
+            writeCapacity: 5,
+        });
+        // CloudFormation creates at most one GSI per table update: on a stack deployed
+        // before these indexes existed, deploy once with `-c skipCategoryIndex=true`
+        // and then again without it
+        if (String(this.node.tryGetContext('skipCategoryIndex')) !== 'true') {
+            resultsTable.addGlobalSecondaryIndex({
+                indexName: 'CategoryUploadTimeIndex',
+                partitionKey: { name: 'category', type: dynamodb.AttributeType.STRING },
+                sortKey: { name: 'uploadTime', type: dynamodb.AttributeType.STRING },
+                projectionType: dynamodb.ProjectionType.INCLUDE,
+                nonKeyAttributes: ['fileName', 'status'],
+                readCapacity: 5,
+                writeCapacity: 5,
+            });
+        }
+        // DynamoDB table for near-duplicate fingerprint bands
+        const fingerprintTable = new dynamodb.Table(this, `FingerprintTable${suffix}`, {
+            tableName: `idp-fingerprints-${suffix}`,
+            partitionKey: { name: 'band', type: dynamodb.AttributeType.STRING },
+            sortKey: { name: 'documentId', type: dynamodb.AttributeType.STRING },
+            // On-demand: every cache miss writes one item per band and every lookup queries each band
+            billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            removalPolicy: cdk.RemovalPolicy.DESTROY,
+        });
         // IAM role for Lambda functions
         const lambdaRole = new iam.Role(this, `LambdaRole${suffix}`, {
             assumedBy: new iam.ServicePrincipal('lambda.amazonaws.com'),
@@ -83,8 +118,8 @@ class IdpApp100420251116Stack extends cdk.Stack {
                     statements: [
                         new iam.PolicyStatement({
                             effect: iam.Effect.ALLOW,
-                            actions: ['dynamodb:PutItem', 'dynamodb:GetItem', 'dynamodb:UpdateItem', 'dynamodb:Query'],
-                            resources: [resultsTable.tableArn],
+                            actions: ['dynamodb:PutItem', 'dynamodb:GetItem', 'dynamodb:UpdateItem', 'dynamodb:Query', 'dynamodb:BatchWriteItem'],
+                            resources: [resultsTable.tableArn, `${resultsTable.tableArn}/index/*`, fingerprintTable.tableArn],
                         }),
                     ],
                 }),
@@ -134,35 +169,90 @@ class IdpApp100420251116Stack extends cdk.Stack {
                 TABLE_NAME: resultsTable.tableName,
             },
         });
-        // Processing Lambda function (combines OCR, Classification, and Summarization)
-        const processingLambda = new lambda.Function(this, `ProcessingLambda${suffix}`, {
-            functionName: `idp-processing-${suffix}`,
+        // Documents Lambda function (indexed listing)
+        const documentsLambda = new lambda.Function(this, `DocumentsLambda${suffix}`, {
+            functionName: `idp-documents-${suffix}`,
             runtime: lambda.Runtime.PYTHON_3_11,
-            handler: 'processing.handler',
+            handler: 'documents.handler',
             role: lambdaRole,
-            timeout: cdk.Duration.minutes(10),
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda-functions')),
             environment: {
-                BUCKET_NAME: documentBucket.bucketName,
                 TABLE_NAME: resultsTable.tableName,
             },
         });
-        // EventBridge rule to trigger processing on S3 upload
-        const s3UploadRule = new events.Rule(this, `S3UploadRule${suffix}`, {
-            eventPattern: {
-                source: ['aws.s3'],
-                detailType: ['Object Created'],
-                detail: {
-                    bucket: {
-                        name: [documentBucket.bucketName],
+        // Processing lanes: uploads are routed by object size so small interactive documents
+        // are not queued behind large multi-page scans. Each lane has its own queue, reserved
+        // concurrency and timeout, and runs the same processing handler (OCR, Classification,
+        // and Summarization).
+        const largeDocumentBytes = 5 * 1024 * 1024;
+        const processingLanes = [
+            { name: 'small', size: events.Match.lessThan(largeDocumentBytes), reservedConcurrency: 20, timeoutMinutes: 5, batchSize: 10, batchingWindowSeconds: 2 },
+            { name: 'large', size: events.Match.greaterThanOrEqual(largeDocumentBytes), reservedConcurrency: 5, timeoutMinutes: 10, batchSize: 1, batchingWindowSeconds: 0 },
+        ];
+        // Failed messages are retried until this many receives, then move to the dead-letter queue
+        const maxReceiveCount = 3;
+        for (const lane of processingLanes) {
+            const laneId = lane.name.charAt(0).toUpperCase() + lane.name.slice(1);
+            const laneDeadLetterQueue = new sqs.Queue(this, `Processing${laneId}DeadLetterQueue${suffix}`, {
+                queueName: `idp-processing-${lane.name}-dlq-${suffix}`,
+                retentionPeriod: cdk.Duration.days(14),
+            });
+            const laneQueue = new sqs.Queue(this, `Processing${laneId}Queue${suffix}`, {
+                queueName: `idp-processing-${lane.name}-${suffix}`,
+                visibilityTimeout: cdk.Duration.minutes(lane.timeoutMinutes * 6),
+                deadLetterQueue: { queue: laneDeadLetterQueue, maxReceiveCount },
+            });
+            const laneLambda = new lambda.Function(this, `Processing${laneId}Lambda${suffix}`, {
+                functionName: `idp-processing-${lane.name}-${suffix}`,
+                runtime: lambda.Runtime.PYTHON_3_11,
+                handler: 'processing.handler',
+                role: lambdaRole,
+                timeout: cdk.Duration.minutes(lane.timeoutMinutes),
+                reservedConcurrentExecutions: lane.reservedConcurrency,
+                code: lambda.Code.fromAsset(path.join(__dirname, '../lambda-functions')),
+                environment: {
+                    BUCKET_NAME: documentBucket.bucketName,
+                    TABLE_NAME: resultsTable.tableName,
+                    OCR_MODE: 'adaptive',
+                    FINGERPRINT_TABLE_NAME: fingerprintTable.tableName,
+                    NEAR_DUPLICATE_SIMILARITY: '0.7',
+                    NEAR_DUPLICATE_REUSE_SUMMARY: 'false',
+                    NEAR_DUPLICATE_AUDIT_RATE: '0.05',
+                    LANE: lane.name,
+                    MAX_RECEIVE_COUNT: String(maxReceiveCount),
+                    // Cache misses in one SQS batch share a single classification request
+                    CLASSIFICATION_BATCH_SIZE: String(lane.batchSize),
+                },
+            });
+            laneLambda.addEventSource(new lambdaEventSources.SqsEventSource(laneQueue, {
+                batchSize: lane.batchSize,
+                maxBatchingWindow: lane.batchingWindowSeconds ? cdk.Duration.seconds(lane.batchingWindowSeconds) : undefined,
+                reportBatchItemFailures: true,
+            }));
+            // EventBridge rule to route S3 uploads of this size to the lane queue
+            const laneRule = new events.Rule(this, `S3Upload${laneId}Rule${suffix}`, {
+                eventPattern: {
+                    source: ['aws.s3'],
+                    detailType: ['Object Created'],
+                    detail: {
+                        bucket: {
+                            name: [documentBucket.bucketName],
+                        },
+                        object: {
+                            size: lane.size,
+                        },
                     },
                 },
-            },
-        });
-        s3UploadRule.addTarget(new targets.LambdaFunction(processingLambda));
+            });
+            laneRule.addTarget(new targets.SqsQueue(laneQueue));
+        }
         // API Gateway
         const api = new apigateway.RestApi(this, `IdpApi${suffix}`, {
             restApiName: `idp-api-${suffix}`,
+            // Compressed responses are returned base64-encoded only to clients that send
+            // Accept: application/vnd.idp+json; every other request and response stays text,
+            // so JSON request bodies and the CORS preflight mock integration are unaffected
+            binaryMediaTypes: ['application/vnd.idp+json'],
             defaultCorsPreflightOptions: {
                 allowOrigins: apigateway.Cors.ALL_ORIGINS,
                 allowMethods: apigateway.Cors.ALL_METHODS,
@@ -171,9 +261,11 @@ class IdpApp100420251116Stack extends cdk.Stack {
         });
         const uploadIntegration = new apigateway.LambdaIntegration(uploadLambda);
         const resultsIntegration = new apigateway.LambdaIntegration(resultsLambda);
+        const documentsIntegration = new apigateway.LambdaIntegration(documentsLambda);
         api.root.addResource('upload').addMethod('POST', uploadIntegration);
         const resultsResource = api.root.addResource('results');
         resultsResource.addResource('{documentId}').addMethod('GET', resultsIntegration);
+        api.root.addResource('documents').addMethod('GET', documentsIntegration);
         // Output the API endpoint
         new cdk.CfnOutput(this, 'ApiEndpoint', {
             value: api.url,
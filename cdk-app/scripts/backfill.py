@@ -0,0 +1,273 @@
+"""Re-run pipeline stages over documents already in the results table.
+
+Pages through the table with parallel Scan segments, selects documents by
+status, category or outdated stage version, and re-runs the chosen stages
+through a bounded worker pool under a global requests-per-second cap.
+Progress is checkpointed per segment so an interrupted run with the same
+selection resumes where it stopped; the checkpoint is removed once every
+segment has finished.
+
+Run from cdk-app, with AWS credentials for the deployed stack:
+    python scripts/backfill.py --stages classification,summary --category Other
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda-functions'))
+
+from boto3.dynamodb.conditions import Attr
+
+import processing
+
+STAGES = ['ocr', 'classification', 'summary']
+SUFFIX = '100420251116'
+
+class RateLimiter:
+    """Token bucket shared by all workers.
+
+    The bucket holds at least one token so rates below one request per
+    second still admit a request every 1 / rate seconds.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class Checkpoint:
+    """Per-segment LastEvaluatedKey, written after every completed page.
+
+    The selection (table, stages and filters) is stored with the progress and a
+    checkpoint written for a different selection is refused. With no path the
+    checkpoint is kept in memory only, as for --dry-run.
+    """
+
+    def __init__(self, path, segments, selection):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {'segments': {}}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+            if self.state.get('totalSegments') not in (None, segments):
+                raise SystemExit(f'{path} was written with {self.state["totalSegments"]} segments')
+            if self.state.get('selection') != selection:
+                raise SystemExit(
+                    f'{path} was written for {json.dumps(self.state.get("selection"))}; '
+                    'rerun with the same options or remove it'
+                )
+        self.state['totalSegments'] = segments
+        self.state['selection'] = selection
+
+    def segment(self, index):
+        return self.state['segments'].get(str(index), {'lastKey': None, 'done': False, 'processed': 0, 'failed': 0})
+
+    def save(self, index, segment):
+        with self.lock:
+            self.state['segments'][str(index)] = segment
+            if not self.path:
+                return
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+def build_filter(args):
+    conditions = []
+    if args.status:
+        conditions.append(Attr('status').eq(args.status))
+    if args.category:
+        conditions.append(Attr('category').eq(args.category))
+    if args.outdated:
+        outdated = [
+            Attr(f'stageVersions.{stage}').not_exists() | Attr(f'stageVersions.{stage}').ne(processing.STAGE_VERSIONS[stage])
+            for stage in args.stages
+        ]
+        conditions.append(reduce(lambda a, b: a | b, outdated))
+    return reduce(lambda a, b: a & b, conditions) if conditions else None
+
+def is_error(text):
+    return str(text or '').startswith('Error')
+
+def has_all_stages(item, updates):
+    """Whether the document has successful OCR, classification and summary once updates are applied."""
+    ocr_results = updates.get('ocrResults', item.get('ocrResults'))
+    classification = updates.get('classification', item.get('classification'))
+    summary = updates.get('summary', item.get('summary'))
+    return (
+        bool(ocr_results) and 'error' not in ocr_results
+        and bool(classification) and not is_error(classification.get('reason'))
+        and bool(summary) and not is_error(summary.get('text'))
+    )
+
+def reprocess(table_name, bucket_name, item, stages, limiter):
+    table = processing.dynamodb_table(table_name)
+    document_id = item['documentId']
+    raw_text = item.get('ocrResults', {}).get('rawText', '')
+    category = item.get('category') or item.get('classification', {}).get('category', 'Other')
+    updates = {}
+
+    if 'ocr' in stages:
+        # Adaptive OCR may make a second Textract request; each one takes a token
+        ocr_results = processing.perform_ocr(bucket_name, document_id, limiter.acquire)
+        if 'error' in ocr_results:
+            raise RuntimeError(ocr_results['error'])
+        updates['ocrResults'] = ocr_results
+        raw_text = ocr_results.get('rawText', '')
+
+    if 'classification' in stages:
+        limiter.acquire()
+        classification = processing.classify_document(raw_text)
+        if is_error(classification.get('reason')):
+            raise RuntimeError(classification['reason'])
+        updates['classification'] = classification
+        updates['category'] = category = classification.get('category', 'Other')
+
+    if 'summary' in stages:
+        limiter.acquire()
+        summary = processing.generate_summary(raw_text, category)
+        if is_error(summary.get('text')):
+            raise RuntimeError(summary['text'])
+        updates['summary'] = summary
+
+    versions = dict(item.get('stageVersions') or {})
+    versions.update({stage: processing.STAGE_VERSIONS[stage] for stage in stages})
+    updates['stageVersions'] = versions
+    # A previously failed document is complete only once every stage has a result
+    complete = has_all_stages(item, updates)
+    if complete:
+        updates['status'] = 'complete'
+
+    names = {f'#a{i}': name for i, name in enumerate(updates)}
+    table.update_item(
+        Key={'documentId': document_id},
+        UpdateExpression='SET ' + ', '.join(f'{alias} = :v{i}' for i, alias in enumerate(names))
+            + (' REMOVE processingError' if complete else ''),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues={f':v{i}': value for i, value in enumerate(updates.values())}
+    )
+
+def run_segment(index, args, pool, limiter, checkpoint):
+    table = processing.dynamodb_table(args.table)
+    segment = checkpoint.segment(index)
+    if segment['done']:
+        return segment
+
+    scan = {
+        'Segment': index,
+        'TotalSegments': args.segments,
+        'Limit': args.page_size,
+        'ProjectionExpression': (
+            'documentId, #status, category, classification.category, classification.reason, '
+            'summary.#text, stageVersions, ocrResults.rawText, ocrResults.#error'
+        ),
+        'ExpressionAttributeNames': {'#status': 'status', '#text': 'text', '#error': 'error'}
+    }
+    filter_expression = build_filter(args)
+    if filter_expression is not None:
+        scan['FilterExpression'] = filter_expression
+
+    while True:
+        if segment['lastKey']:
+            scan['ExclusiveStartKey'] = segment['lastKey']
+        response = table.scan(**scan)
+        items = response.get('Items', [])
+
+        if args.dry_run:
+            for item in items:
+                print(item['documentId'])
+            segment['processed'] += len(items)
+        else:
+            futures = [pool.submit(reprocess, args.table, args.bucket, item, args.stages, limiter) for item in items]
+            for item, future in zip(items, futures):
+                try:
+                    future.result()
+                    segment['processed'] += 1
+                except Exception as e:
+                    segment['failed'] += 1
+                    print(f'{item["documentId"]}: {e}', file=sys.stderr)
+
+        segment['lastKey'] = response.get('LastEvaluatedKey')
+        segment['done'] = segment['lastKey'] is None
+        checkpoint.save(index, segment)
+        if segment['done']:
+            return segment
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--table', default=f'idp-results-{SUFFIX}')
+    parser.add_argument('--bucket', default=f'idp-documents-{SUFFIX}')
+    parser.add_argument('--stages', default='classification,summary', help='comma-separated subset of ' + ','.join(STAGES))
+    parser.add_argument('--status', help='only documents with this status, e.g. error')
+    parser.add_argument('--category', help='only documents in this category')
+    parser.add_argument('--outdated', action='store_true', help='only documents whose selected stages ran with an older STAGE_VERSIONS entry')
+    parser.add_argument('--segments', type=int, default=4, help='parallel Scan segments')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=8, help='documents reprocessed concurrently')
+    parser.add_argument('--rps', type=float, default=5.0, help='global cap on Bedrock/Textract requests per second')
+    parser.add_argument('--checkpoint', default='backfill-checkpoint.json')
+    parser.add_argument('--dry-run', action='store_true', help='list selected documents without reprocessing')
+    args = parser.parse_args()
+
+    args.stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown or not args.stages:
+        parser.error(f'--stages must be a subset of {",".join(STAGES)}')
+    if args.rps <= 0:
+        parser.error('--rps must be greater than 0')
+    # Stages always run in pipeline order
+    args.stages = [stage for stage in STAGES if stage in args.stages]
+    return args
+
+def main():
+    args = parse_args()
+    limiter = RateLimiter(args.rps)
+    selection = {
+        'table': args.table,
+        'stages': args.stages,
+        'status': args.status,
+        'category': args.category,
+        'outdated': args.outdated
+    }
+    checkpoint = Checkpoint(None if args.dry_run else args.checkpoint, args.segments, selection)
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool, ThreadPoolExecutor(max_workers=args.segments) as scanners:
+        segments = list(scanners.map(
+            lambda index: run_segment(index, args, pool, limiter, checkpoint),
+            range(args.segments)
+        ))
+
+    if all(segment['done'] for segment in segments):
+        checkpoint.clear()
+
+    processed = sum(segment['processed'] for segment in segments)
+    failed = sum(segment['failed'] for segment in segments)
+    print(f'{processed} documents {"selected" if args.dry_run else "reprocessed"}, {failed} failed in {time.time() - started:.1f}s')
+
+if __name__ == '__main__':
+    main()
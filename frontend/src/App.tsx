@@ -36,7 +36,10 @@ function App() {
 
     const poll = async () => {
       try {
-        const response = await fetch(`${apiEndpoint}/results/${documentId}`);
+        const response = await fetch(`${apiEndpoint}/results/${documentId}`, {
+          // Opts in to gzip-compressed results; the browser decompresses them
+          headers: { Accept: 'application/vnd.idp+json' },
+        });
         const data = await response.json();
 
         if (response.ok) {
@@ -28,6 +28,8 @@ const ResultsDisplay: React.FC<ResultsDisplayProps> = ({ result, isProcessing })
         return 'Generating document summary...';
       case 'complete':
         return 'Processing complete!';
+      case 'retrying':
+        return 'Processing failed; retrying...';
       case 'error':
         return 'An error occurred during processing.';
       default:
@@ -38,6 +40,7 @@ const ResultsDisplay: React.FC<ResultsDisplayProps> = ({ result, isProcessing })
   const getProgressPercentage = () => {
     switch (result.status) {
       case 'uploaded':
+      case 'retrying':
         return 10;
       case 'processing_ocr':
         return 30;
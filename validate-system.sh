@@ -59,7 +59,7 @@ fi
 
 # Test Lambda functions
 echo "4. Testing Lambda functions..."
-FUNCTIONS=("idp-upload-100420251116" "idp-results-100420251116" "idp-processing-100420251116")
+FUNCTIONS=("idp-upload-100420251116" "idp-results-100420251116" "idp-documents-100420251116" "idp-processing-small-100420251116" "idp-processing-large-100420251116")
 
 for func in "${FUNCTIONS[@]}"; do
     if aws lambda get-function --function-name "$func" > /dev/null 2>&1; then